@@ -1,27 +1,32 @@
 #!/usr/bin/env python
 import os
-import re
 from setuptools import setup, find_packages
 
 
-long_description = open(
-    os.path.join(
-        os.path.dirname(__file__),
-        'README.md'
-    )
-).read()
+def read_long_description():
+    path = os.path.join(os.path.dirname(__file__), 'README.md')
+    with open(path, encoding="utf8") as f:
+        return f.read()
+
+
+def read_version():
+    with open("transient/__init__.py", encoding="utf8") as f:
+        # The version line has a fixed format, so there is no need for a regex
+        _, found, rest = f.read().partition('__version__ = "')
+    version = rest.partition('"')[0]
+    if not found or not version:
+        raise RuntimeError("Unable to find __version__ in transient/__init__.py")
+    return version
 
-with open("transient/__init__.py", encoding="utf8") as f:
-    version = re.search(r'__version__ = "(.*?)"', f.read()).group(1)
 
 setup(
     name='transient',
     author='Adam Schwalm',
-    version=version,
+    version=read_version(),
     license='LICENSE',
     url='https://github.com/ALSchwalm/transient',
     description='A QEMU wrapper adding vagrant support and shared folders',
-    long_description=long_description,
+    long_description=read_long_description(),
     long_description_content_type="text/markdown",
     packages=find_packages('.', exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     install_requires=[
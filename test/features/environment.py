@@ -0,0 +1,7 @@
+import os
+
+
+def before_all(context):
+    # The environment commands are started with. Steps that set environment
+    # variables only record overrides, which are merged over this snapshot.
+    context.base_environ = dict(os.environ)
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def scratch_root(tmp_path_factory):
+    # A single directory shared by the whole session. pytest removes it
+    # (along with the rest of its base temp directory) on a later run.
+    return tmp_path_factory.mktemp("unit")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: waits on real processes or timeouts")
+
+
+def pytest_collection_modifyitems(items):
+    # Start the slow tests first, so that when the suite is spread across
+    # several workers they don't end up running last. The sort is stable, so
+    # the order is otherwise unchanged.
+    items.sort(key=lambda item: item.get_closest_marker("slow") is None)
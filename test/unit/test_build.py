@@ -1,13 +1,37 @@
 from contextlib import contextmanager
 import pytest
-import tempfile
+import re
 
 import transient.configuration
 import transient.store
 import transient.build
 
 
+# The errors raised for invalid imagefiles, compiled once rather than for
+# each case that expects them
+FROM_COUNT_ERROR = re.compile("Exactly one FROM instruction must appear")
+DISK_REQUIRED_ERROR = re.compile("DISK.*must appear in images built from scratch")
+PARTITION_REQUIRED_ERROR = re.compile(
+    "PARTITION.*must appear in images built from scratch"
+)
+ROOT_MOUNT_ERROR = re.compile("PARTITION.*must mount at /")
+DISK_NOT_SCRATCH_ERROR = re.compile(
+    "DISK and PARTITION.*can only appear on images built from scratch"
+)
+FROM_ORDER_ERROR = re.compile(
+    "FROM instruction must appear before any other instructions"
+)
+DISK_ORDER_ERROR = re.compile(
+    "DISK instruction must appear immediately after FROM instruction"
+)
+PARTITION_ORDER_ERROR = re.compile(
+    "PARTITION instructions must appear immediately after DISK instruction"
+)
+
+
 def imagefile_id_func(val):
+    if isinstance(val, bytes):
+        val = val.decode("utf8")
     if not isinstance(val, str) or "\n" in val:
         return ""
     else:
@@ -19,29 +43,50 @@ def does_not_raise():
     yield
 
 
+@pytest.fixture(scope="module")
+def store(scratch_root):
+    # These cases only parse imagefiles, so nothing is ever added to the store
+    path = str(scratch_root / "build-store")
+    return transient.store.BackendImageStore(path=path)
+
+
+@pytest.fixture(scope="module")
+def imagefile(scratch_root):
+    # A single imagefile is rewritten for each case, see write_imagefile
+    with open(str(scratch_root / "Imagefile"), "wb+") as imagefile:
+        yield imagefile
+
+
+def write_imagefile(imagefile, contents):
+    imagefile.seek(0)
+    imagefile.truncate()
+    imagefile.write(contents)
+    imagefile.flush()
+
+
 @pytest.mark.parametrize(
     ("description", "contents", "expectation"),
     (
         (
             "Basic imagefile with only source",
-            """
+            b"""
             FROM image_source
             """,
             does_not_raise(),
         ),
         (
             "Basic imagefile from scratch",
-            """
+            b"""
             FROM scratch
             DISK 10Gb GPT
             PARTITION 0 MOUNT /
             """,
             does_not_raise(),
         ),
-        ("Imagefile with no newline", "FROM image_source", does_not_raise()),
+        ("Imagefile with no newline", b"FROM image_source", does_not_raise()),
         (
             "Alpine imagefile",
-            """
+            b"""
             FROM scratch
             DISK 2gb GPT
             PARTITION 1 SIZE 300MB FLAGS bios_grub
@@ -51,106 +96,160 @@ def does_not_raise():
             """,
             does_not_raise(),
         ),
-        (
-            "Requires FROM",
-            "",
-            pytest.raises(RuntimeError, match="Exactly one FROM instruction must appear"),
-        ),
+        ("Requires FROM", b"", pytest.raises(RuntimeError, match=FROM_COUNT_ERROR)),
         (
             "Only one FROM allowed",
-            """
+            b"""
             FROM somesource
             FROM othersource
             """,
-            pytest.raises(RuntimeError, match="Exactly one FROM instruction must appear"),
+            pytest.raises(RuntimeError, match=FROM_COUNT_ERROR),
         ),
         (
             "FROM scratch requires disk",
-            "FROM scratch",
-            pytest.raises(
-                RuntimeError, match="DISK.*must appear in images built from scratch"
-            ),
+            b"FROM scratch",
+            pytest.raises(RuntimeError, match=DISK_REQUIRED_ERROR),
         ),
         (
             "FROM scratch disk must have partition",
-            """
+            b"""
             FROM scratch
             DISK 1GB GPT
             """,
-            pytest.raises(
-                RuntimeError, match="PARTITION.*must appear in images built from scratch"
-            ),
+            pytest.raises(RuntimeError, match=PARTITION_REQUIRED_ERROR),
         ),
         (
             "Some partition must mount at root",
-            """
+            b"""
             FROM scratch
             DISK 1GB GPT
             PARTITION 0
             """,
-            pytest.raises(RuntimeError, match="PARTITION.*must mount at /"),
+            pytest.raises(RuntimeError, match=ROOT_MOUNT_ERROR),
         ),
         (
             "DISK can only be defined FROM scratch",
-            """
+            b"""
             FROM someimage
             DISK 1GB GPT
             """,
-            pytest.raises(
-                RuntimeError,
-                match="DISK and PARTITION.*can only appear on images built from scratch",
-            ),
+            pytest.raises(RuntimeError, match=DISK_NOT_SCRATCH_ERROR),
         ),
         (
             "FROM must appear first",
-            """
+            b"""
             ADD foo /
             FROM someimage
             """,
-            pytest.raises(
-                RuntimeError,
-                match="FROM instruction must appear before any other instructions",
-            ),
+            pytest.raises(RuntimeError, match=FROM_ORDER_ERROR),
         ),
         (
             "DISK must appear after FROM",
-            """
+            b"""
             FROM scratch
             ADD foo /
             DISK 1GB GPT
             PARTITION 0 MOUNT /
             """,
-            pytest.raises(
-                RuntimeError,
-                match="DISK instruction must appear immediately after FROM instruction",
-            ),
+            pytest.raises(RuntimeError, match=DISK_ORDER_ERROR),
         ),
         (
             "PARTITION must appear after DISK",
-            """
+            b"""
             FROM scratch
             DISK 1GB GPT
             ADD foo /
             PARTITION 0 MOUNT /
             """,
-            pytest.raises(
-                RuntimeError,
-                match="PARTITION instructions must appear immediately after DISK instruction",
-            ),
+            pytest.raises(RuntimeError, match=PARTITION_ORDER_ERROR),
         ),
     ),
     ids=imagefile_id_func,
 )
-def test_valid_imagefiles(description, contents, expectation):
+def test_valid_imagefiles(description, contents, expectation, store, imagefile):
     with expectation:
-        with tempfile.TemporaryDirectory() as tempdir:
-            with tempfile.NamedTemporaryFile() as imagefile:
-                imagefile.write(contents.encode("utf8"))
-                imagefile.flush()
+        write_imagefile(imagefile, contents)
+
+        config = transient.configuration.create_transient_build_config(
+            {"file": imagefile.name}
+        )
+
+        builder = transient.build.ImageBuilder(config, store)
+
+
+def _device_wait(device):
+    return (
+        f"(i=0; while [ ! -b {device} ] && [ $i -lt 50 ]; do "
+        "sleep 0.1; i=$((i + 1)); done)"
+    )
+
 
-                store = transient.store.BackendImageStore(path=tempdir)
-                config = transient.configuration.create_transient_build_config(
-                    {"file": imagefile.name}
-                )
+@pytest.mark.parametrize(
+    ("description", "contents", "expected"),
+    (
+        (
+            "Single formatted partition",
+            b"""
+            FROM scratch
+            DISK 1GB GPT
+            PARTITION 1 FORMAT ext4 MOUNT /
+            """,
+            [
+                "printf '%s\\n' 'label:GPT' 'type=L,' | sfdisk /dev/sda",
+                "echo 'Formatting partition 1 (/dev/sda1)'",
+                _device_wait("/dev/sda1"),
+                "mkfs.ext4  /dev/sda1",
+            ],
+        ),
+        (
+            "Formatted and unformatted partitions",
+            b"""
+            FROM scratch
+            DISK 1GB MBR
+            PARTITION 1 SIZE 100MB FLAGS boot
+            PARTITION 2 SIZE 200MB FORMAT xfs OPTIONS "-L data" MOUNT /data
+            PARTITION 3 FORMAT ext4 MOUNT /
+            """,
+            [
+                "printf '%s\\n' 'label:MBR' 'size=100MB,bootable,type=L,' "
+                "'size=200MB,type=L,' 'type=L,' | sfdisk /dev/sda",
+                "echo 'Formatting partition 2 (/dev/sda2)'",
+                _device_wait("/dev/sda2"),
+                "mkfs.xfs -L data /dev/sda2",
+                "echo 'Formatting partition 3 (/dev/sda3)'",
+                _device_wait("/dev/sda3"),
+                "mkfs.ext4  /dev/sda3",
+            ],
+        ),
+        (
+            "No formatted partitions",
+            b"""
+            FROM scratch
+            DISK 1GB GPT
+            PARTITION 1 FLAGS efi
+            PARTITION 2 MOUNT /
+            """,
+            ["printf '%s\\n' 'label:GPT' 'type=U,' 'type=L,' | sfdisk /dev/sda"],
+        ),
+    ),
+    ids=imagefile_id_func,
+)
+def test_partition_commands(description, contents, expected, store, imagefile):
+    write_imagefile(imagefile, contents)
+    config = transient.configuration.create_transient_build_config(
+        {"file": imagefile.name}
+    )
+    builder = transient.build.ImageBuilder(config, store)
 
-                builder = transient.build.ImageBuilder(config, store)
+    instructions = builder.instructions
+    disk = next(
+        instr
+        for instr in instructions
+        if isinstance(instr, transient.build.DiskInstruction)
+    )
+    partitions = [
+        instr
+        for instr in instructions
+        if isinstance(instr, transient.build.PartitionInstruction)
+    ]
+    assert transient.build._partition_commands(disk, partitions) == expected
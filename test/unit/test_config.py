@@ -1,5 +1,5 @@
+import os
 import pytest
-import tempfile
 
 import transient.configuration as configuration
 import transient.args as args
@@ -10,19 +10,21 @@ from typing import Dict, Any
 
 def create_test_run_config(contents: Dict[Any, Any]) -> configuration.RunConfig:
     return configuration.RunConfig(
-        configuration._Config(configuration.RunSchema(), contents)
+        configuration._Config(configuration._shared_schema(args.RUN_PARSER), contents)
     )
 
 
 def create_test_start_config(contents: Dict[Any, Any]) -> configuration.StartConfig:
     return configuration.StartConfig(
-        configuration._Config(configuration.StartSchema(), contents)
+        configuration._Config(
+            configuration._shared_schema(args.START_PARSER, with_defaults=False), contents
+        )
     )
 
 
 def create_test_create_config(contents: Dict[Any, Any]) -> configuration.CreateConfig:
     return configuration.CreateConfig(
-        configuration._Config(configuration.CreateSchema(), contents)
+        configuration._Config(configuration._shared_schema(args.CREATE_PARSER), contents)
     )
 
 
@@ -33,7 +35,14 @@ def id_func(val):
         return val
 
 
-TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
+# Placeholder in the test arguments for the path of the config_file fixture
+CONFIG_FILE_PATH = "<config-file>"
+
+
+@pytest.fixture(scope="module")
+def config_file(scratch_root):
+    with open(str(scratch_root / "config.toml"), "wb+") as config_file:
+        yield config_file
 
 
 @pytest.mark.parametrize(
@@ -44,7 +53,7 @@ TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
             """
             ssh-console=true
             """,
-            ["run", "example-image", "--config", TEMP_CONFIG_FILE.name],
+            ["run", "example-image", "--config", CONFIG_FILE_PATH],
             [],
             create_test_run_config(
                 {"image": "example-image", "qemu_args": [], "ssh_console": True}
@@ -55,7 +64,7 @@ TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
             """
             qemu_args = ["-smp", "2"]
             """,
-            ["run", "example-image", "--config", TEMP_CONFIG_FILE.name],
+            ["run", "example-image", "--config", CONFIG_FILE_PATH],
             ["-m", "1G"],
             create_test_run_config(
                 {"image": "example-image", "qemu_args": ["-smp", "2", "-m", "1G"]}
@@ -70,7 +79,7 @@ TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
                 "run",
                 "example-image",
                 "--config",
-                TEMP_CONFIG_FILE.name,
+                CONFIG_FILE_PATH,
                 "--ssh-command",
                 "final",
             ],
@@ -84,7 +93,7 @@ TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
             """
             qemu_bin_name="foo"
             """,
-            ["run", "example-image", "--config", TEMP_CONFIG_FILE.name],
+            ["run", "example-image", "--config", CONFIG_FILE_PATH],
             [],
             create_test_run_config(
                 {"image": "example-image", "qemu_bin_name": "foo", "qemu_args": []}
@@ -93,11 +102,17 @@ TEMP_CONFIG_FILE = tempfile.NamedTemporaryFile()
     ),
     ids=id_func,
 )
-def test_config_flag(description, config, transient_args, qemu_args, expected):
-    TEMP_CONFIG_FILE.seek(0)
-    TEMP_CONFIG_FILE.write(config.encode("utf-8"))
-    TEMP_CONFIG_FILE.flush()
-
+def test_config_flag(
+    description, config, transient_args, qemu_args, expected, config_file
+):
+    # Truncate first, so nothing from a longer config in an earlier case remains
+    fd = config_file.fileno()
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, config.encode("utf-8"), 0)
+
+    transient_args = [
+        config_file.name if arg == CONFIG_FILE_PATH else arg for arg in transient_args
+    ]
     parsed = args.TransientArgs(transient_args, qemu_args, cli.CLI_COMMAND_MAPPINGS)
     generated = configuration.create_transient_run_config(parsed)
     assert generated == expected
@@ -151,3 +166,40 @@ def test_run_config_from_create_and_start(
     )
 
     assert generated == expected
+
+
+@pytest.mark.parametrize(
+    ("transient_args", "name", "expected"),
+    (
+        (["run", "image"], "ssh_user", False),
+        (["run", "image", "--ssh-user", "vagrant"], "ssh_user", True),
+        (["run", "image", "--name", "test"], "name", True),
+        (["run", "image", "--name", "test"], "ssh_console", False),
+        (["ssh", "vm", "--ssh-command", "ls"], "ssh_command", True),
+        (["image", "rm", "image"], "name", True),
+    ),
+)
+def test_is_user_set(transient_args, name, expected):
+    parsed = args.TransientArgs(transient_args, [], cli.CLI_COMMAND_MAPPINGS)
+    assert parsed.is_user_set(name) is expected
+
+
+def test_list_defaults_are_not_shared(config_file):
+    # Values from the command line are appended to the lists loaded from a config
+    # file, so each load must get its own copy of the (shared) schema's defaults
+    fd = config_file.fileno()
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, b"ssh-console=true\n", 0)
+
+    transient_args = [
+        "run",
+        "example-image",
+        "--config",
+        config_file.name,
+        "-s",
+        "/path/on/host:/path/on/guest",
+    ]
+    for _ in range(2):
+        parsed = args.TransientArgs(transient_args, [], cli.CLI_COMMAND_MAPPINGS)
+        generated = configuration.create_transient_run_config(parsed)
+        assert generated.shared_folder == ["/path/on/host:/path/on/guest"]
@@ -1,7 +1,9 @@
 from transient import qemu
+import pytest
 import signal
 
 
+@pytest.mark.slow
 def test_qemu_terminate():
     class StalledQemuRunner(qemu.QemuRunner):
         def _make_command_line(self):
@@ -15,6 +17,7 @@ def test_qemu_terminate():
     assert runner.returncode() == -signal.SIGTERM
 
 
+@pytest.mark.slow
 def test_qemu_terminate_kill_after():
     class StalledQemuRunner(qemu.QemuRunner):
         def _make_command_line(self):
@@ -30,5 +33,6 @@ def test_qemu_terminate_kill_after():
     assert runner.is_running()
     runner.terminate()
     assert runner.is_running()
-    runner.terminate(kill_after=1)
+    # sleep ignores SIGTERM here, so this always waits out the full kill_after
+    runner.terminate(kill_after=0.1)
     assert runner.returncode() == -signal.SIGKILL
@@ -8,6 +8,8 @@ STORAGE_ENCODE_TESTS = (
     ("with space", "with%20space"),
     ("with-dash", "with%2Ddash"),
     ("with/slash", "with%2Fslash"),
+    ("with:colon", "with%3Acolon"),
+    ("non-ascii-\u00e9", "non%2Dascii%2D%C3%A9"),
 )
 
 
@@ -1,46 +1,48 @@
 import pytest
-import tempfile
 import time
 
 import transient.utils as u
 
 # fmt: off
+PROMPT_YES_NO_TESTS = (
+    ( None,   ('y',),           True ),
+    ( None,   ('Y',),           True ),
+    ( None,   ('yes',),         True ),
+    ( None,   ('YES',),         True ),
+    ( None,   ('true',),        True ),
+    ( None,   ('1',),           True ),
+
+    ( None,   ('n',),           False ),
+    ( None,   ('N',),           False ),
+    ( None,   ('no',),          False ),
+    ( None,   ('NO',),          False ),
+    ( None,   ('false',),       False ),
+    ( None,   ('0',),           False ),
+
+    ( None,   ('', 'y'),        True ),
+    ( None,   ('', 'f'),        False ),
+    ( None,   ('a', 'b', 'y'),  True ),
+    ( None,   ('a', 'b', 'f'),  False ),
+
+    ( True,   ('y',),           True ),
+    ( True,   ('n',),           False ),
+    ( True,   ('',),            True ),
+    ( True,   ('a', 'b', 'y'),  True ),
+    ( True,   ('a', 'b', 'f'),  False ),
+    ( True,   ('a', 'b', ''),   True ),
+
+    ( False,  ('y',),           True ),
+    ( False,  ('n',),           False ),
+    ( False,  ('',),            False ),
+    ( False,  ('a', 'b', 'y'),  True ),
+    ( False,  ('a', 'b', 'f'),  False ),
+    ( False,  ('a', 'b', ''),   False ),
+)
+
+
 @pytest.mark.parametrize(
     [ 'default', 'entries', 'expected' ],
-    [
-        ( None,   ('y',),           True ),
-        ( None,   ('Y',),           True ),
-        ( None,   ('yes',),         True ),
-        ( None,   ('YES',),         True ),
-        ( None,   ('true',),        True ),
-        ( None,   ('1',),           True ),
-
-        ( None,   ('n',),           False ),
-        ( None,   ('N',),           False ),
-        ( None,   ('no',),          False ),
-        ( None,   ('NO',),          False ),
-        ( None,   ('false',),       False ),
-        ( None,   ('0',),           False ),
-
-        ( None,   ('', 'y'),        True ),
-        ( None,   ('', 'f'),        False ),
-        ( None,   ('a', 'b', 'y'),  True ),
-        ( None,   ('a', 'b', 'f'),  False ),
-
-        ( True,   ('y',),           True ),
-        ( True,   ('n',),           False ),
-        ( True,   ('',),            True ),
-        ( True,   ('a', 'b', 'y'),  True ),
-        ( True,   ('a', 'b', 'f'),  False ),
-        ( True,   ('a', 'b', ''),   True ),
-
-        ( False,  ('y',),           True ),
-        ( False,  ('n',),           False ),
-        ( False,  ('',),            False ),
-        ( False,  ('a', 'b', 'y'),  True ),
-        ( False,  ('a', 'b', 'f'),  False ),
-        ( False,  ('a', 'b', ''),   False ),
-    ],
+    PROMPT_YES_NO_TESTS,
     # function to make 'entries' part of the test name more legible
     ids=lambda arg: '/'.join(map(repr, arg)) if isinstance(arg, tuple) else None,
 )
@@ -54,50 +56,55 @@ def test_prompt_yes_no(default, entries, expected, monkeypatch):
     assert u.prompt_yes_no("test prompt", default) == expected
 
 # fmt: on
-def test_lock_file():
-    with tempfile.NamedTemporaryFile() as f:
-        with u.lock_file(f.name, "r", timeout=0) as locked:
-            pass
+@pytest.fixture
+def lockpath(tmp_path):
+    path = tmp_path / "lock"
+    path.touch()
+    return str(path)
+
+
+def test_lock_file(lockpath):
+    with u.lock_file(lockpath, "r", timeout=0) as locked:
+        pass
 
 
-def test_lock_file_unlocks():
-    with tempfile.NamedTemporaryFile() as f:
-        with u.lock_file(f.name, "r", timeout=0) as locked:
-            pass
+def test_lock_file_unlocks(lockpath):
+    with u.lock_file(lockpath, "r", timeout=0) as locked:
+        pass
 
-        # We should be able to get the lock again
-        with u.lock_file(f.name, "r", timeout=0) as locked:
-            pass
+    # We should be able to get the lock again
+    with u.lock_file(lockpath, "r", timeout=0) as locked:
+        pass
 
 
-def test_lock_file_not_recursive():
+def test_lock_file_not_recursive(lockpath):
     with pytest.raises(OSError):
-        with tempfile.NamedTemporaryFile() as f:
-            with u.lock_file(f.name, "r", timeout=0) as locked:
-                with u.lock_file(f.name, "r", timeout=0) as second_lock:
-                    pass
+        with u.lock_file(lockpath, "r", timeout=0) as locked:
+            with u.lock_file(lockpath, "r", timeout=0) as second_lock:
+                pass
 
 
-def test_lock_file_timeout():
-    with tempfile.NamedTemporaryFile() as f:
-        with u.lock_file(f.name, "r", timeout=0) as locked:
-            lock_timeout = 0.5
-            start_time = time.time()
-            try:
-                with u.lock_file(f.name, "r", timeout=lock_timeout) as second_lock:
-                    pass
-            except OSError:
-                assert time.time() - start_time >= lock_timeout
+@pytest.mark.slow
+def test_lock_file_timeout(lockpath):
+    with u.lock_file(lockpath, "r", timeout=0) as locked:
+        lock_timeout = 0.5
+        start_time = time.monotonic()
+        with pytest.raises(OSError):
+            with u.lock_file(lockpath, "r", timeout=lock_timeout) as second_lock:
+                pass
+        assert time.monotonic() - start_time >= lock_timeout
 
 
 @pytest.mark.parametrize(
     ("paths", "expected"),
-    [
+    (
         (("/mnt", "/root"), "/mnt/root"),
         (("/mnt", "/root/nested"), "/mnt/root/nested"),
         (("/mnt", "/root", "/other"), "/mnt/root/other"),
         (("/mnt",), "/mnt"),
-    ],
+        (("/mnt/", "root/", "/other"), "/mnt/root/other"),
+        (("/", "/root"), "/root"),
+    ),
 )
 def test_join_absolute_paths(paths, expected):
     assert u.join_absolute_paths(*paths) == expected
@@ -105,14 +112,30 @@ def test_join_absolute_paths(paths, expected):
 
 @pytest.mark.parametrize(
     ("test_input", "expected"),
-    [
+    (
         (0, "0.00 B"),
         (1024, "1.00 KiB"),
         (1024 * 1024 + (1024 * 1024) / 2, "1.50 MiB"),
         (1024 * 1024 * 1024, "1.00 GiB"),
         (1024 * 1024 * 1024 * 1024, "1.00 TiB"),
         (10000, "9.77 KiB"),
-    ],
+        (1024 * 1024 * 1024 * 1024 * 1024, "1024.00 TiB"),
+    ),
 )
 def test_format_bytes(test_input, expected):
     assert u.format_bytes(test_input) == expected
+
+
+@pytest.mark.parametrize("kernel_copy", (True, False))
+def test_copy_file_with_progress(tmp_path, kernel_copy, monkeypatch):
+    if not kernel_copy:
+        monkeypatch.setattr(u, "_kernel_copy_methods", lambda: [])
+
+    data = bytes(range(256)) * 4096 + b"tail"
+    source, destination = tmp_path / "source", tmp_path / "destination"
+    source.write_bytes(data)
+
+    with source.open("rb") as src, destination.open("wb") as dst:
+        u.copy_file_with_progress(src.fileno(), dst.fileno(), len(data), block_size=4096)
+
+    assert destination.read_bytes() == data
@@ -1,200 +1,284 @@
 import argparse
+import functools
 
-from . import ssh
 from . import utils
-from . import qemu
 from . import __version__
 
-from typing import Any, Tuple, Optional, List, Iterator, Dict, Callable
+from typing import Any, Tuple, Optional, List, Iterator, Dict, Callable, Sequence
+
+
+@functools.lru_cache(maxsize=None)
+def _defaults() -> Dict[str, Any]:
+    """Returns the default values of all arguments, by 'dest'
+
+    The parsers themselves use 'SUPPRESS' as the default for every argument, so the
+    values a user actually passed can be told apart from the defaults with a single
+    parse. Arguments not listed default to None, and arguments that can be given more
+    than once default to an (immutable) tuple that is turned into a new list for use.
+
+    The defaults are only needed once a command has been selected (or help is shown),
+    so they are not computed until then. This is also why 'ssh' and 'qemu' are only
+    imported here.
+    """
+    from . import ssh
+    from . import qemu
+
+    return {
+        "vmstore": utils.default_vmstore_dir(),
+        "image_backend": utils.default_backend_dir(),
+        "ssh_user": "vagrant",
+        "ssh_bin_name": "ssh",
+        "ssh_timeout": ssh.SSH_DEFAULT_TOTAL_TIMEOUT,
+        "ssh_option": (),
+        "sftp_bin_name": "sftp-server",
+        "ssh_net_driver": "virtio-net-pci",
+        "shutdown_timeout": 20,
+        "qemu_bin_name": "qemu-system-x86_64",
+        "qmp_timeout": qemu.QMP_DEFAULT_TIMEOUT,
+        "shared_folder": (),
+        "copy_in_before": (),
+        "copy_out_after": (),
+        "extra_image": (),
+    }
 
 
 class TransientArgumentDefaultsHelpFormatter(argparse.HelpFormatter):
+    _DEFAULTING_NARGS = frozenset((argparse.OPTIONAL, argparse.ZERO_OR_MORE))
+
     def _get_help_string(self, action: argparse.Action) -> Optional[str]:
         help = action.help
         if help is not None and "%(default)" not in help:
-            if action.default not in (argparse.SUPPRESS, None, []):
-                defaulting_nargs = [argparse.OPTIONAL, argparse.ZERO_OR_MORE]
-                if action.option_strings or action.nargs in defaulting_nargs:
-                    help += " [default: %(default)s]"
+            # Arguments default to 'SUPPRESS', so unless an action has its own
+            # default, show the one the command will fill in
+            default = action.default
+            if default in (None, argparse.SUPPRESS):
+                default = _defaults().get(action.dest)
+            if default not in (None, ()):
+                if action.option_strings or action.nargs in self._DEFAULTING_NARGS:
+                    # The help is %-formatted, and 'default' is not an attribute
+                    # of the action, so include the value itself
+                    help += " [default: {}]".format(str(default).replace("%", "%%"))
         return help
 
     def _fill_text(self, text: str, _width: Any, indent: str) -> str:
         return "".join(indent + line for line in text.splitlines(keepends=True))
 
 
-def define_parsers(include_defaults: bool) -> Tuple[argparse.ArgumentParser, ...]:
-    def set_default(value: Any) -> Any:
-        if include_defaults is True:
-            return value
-        else:
-            return None
-
-    # Common arguments used for all subcommands
-    common_parser = argparse.ArgumentParser(add_help=False)
-
-    # Use 'SUPPRESS' here so subcommand parser values won't override flags passed
-    # earlier in the command line
-    common_parser.add_argument(
-        "--verbose",
-        "-v",
-        action="count",
-        default=argparse.SUPPRESS,
-        help="Verbosity level for logging",
-    )
-    common_parser.add_argument(
-        "--vmstore",
-        type=str,
-        default=set_default(utils.default_vmstore_dir()),
-        help="Location to place VM images and configuration files",
-    )
-    common_parser.add_argument(
-        "--image-backend",
-        type=str,
-        default=set_default(utils.default_backend_dir()),
-        help="Location to place the shared, read-only backing disk images",
-    )
+class LazyArgumentParser(argparse.ArgumentParser):
+    """An ArgumentParser that only adds its arguments once it is actually used
 
-    # Common arguments for commands that use SSH in some way
-    common_ssh_parser = argparse.ArgumentParser(add_help=False)
-    common_ssh_parser.add_argument(
-        "--ssh-user", type=str, help="User to pass to SSH", default=set_default("vagrant")
-    )
-    common_ssh_parser.add_argument(
-        "--ssh-bin-name", type=str, help="SSH binary to use", default=set_default("ssh")
-    )
-    common_ssh_parser.add_argument(
-        "--ssh-timeout",
-        type=int,
-        default=set_default(ssh.SSH_DEFAULT_TOTAL_TIMEOUT),
-        help="Time to wait for SSH connection before failing",
-    )
-    common_ssh_parser.add_argument(
-        "--ssh-command", "--cmd", type=str, help="Run an ssh command instead of a console"
-    )
-    common_ssh_parser.add_argument(
-        "--ssh-option",
-        "-o",
-        type=str,
-        action="append",
-        help="Pass an option to SSH",
-        default=set_default([]),
-    )
+    Only the parser of the selected subcommand is ever used for a given command
+    line, so this avoids adding the arguments of every other subcommand. Both the
+    shared 'arguments' table and the 'populate' callback, which adds the parser's
+    own arguments, are deferred until the first parse, help output or explicit call
+    to populate().
 
-    # Common arguments for all vm running features (e.g., create/start/run)
-    common_run_parser = argparse.ArgumentParser(
-        add_help=False, parents=[common_ssh_parser, common_parser]
-    )
-    common_run_parser.add_argument(
-        "--ssh-console",
-        "--ssh",
-        action="store_const",
-        const=True,
-        help="Use an ssh connection instead of the serial console",
-    )
-    common_run_parser.add_argument(
-        "--ssh-with-serial",
-        "--sshs",
-        action="store_const",
-        const=True,
-        help="Show the serial output before SSH connects (implies --ssh)",
-    )
-    common_run_parser.add_argument(
-        "--sftp-bin-name",
-        type=str,
-        help="SFTP server binary to use",
-        default=set_default("sftp-server"),
-    )
-    common_run_parser.add_argument(
-        "--ssh-port", type=int, help="Host port the guest port 22 is connected to"
-    )
-    common_run_parser.add_argument(
-        "--ssh-net-driver",
-        type=str,
-        help="The QEMU virtual network device driver e.g. e1000, rtl8139, virtio-net-pci",
-        default=set_default("virtio-net-pci"),
-    )
-    common_run_parser.add_argument(
-        "--no-virtio-scsi",
-        action="store_const",
-        const=True,
-        help="Use the QEMU default drive interface (ide) instead of virtio-pci-scsi",
-    )
-    common_run_parser.add_argument(
-        "--shutdown-timeout",
-        type=int,
-        default=set_default(20),
-        help="The time in seconds to wait for shutdown before terminating QEMU",
-    )
-    common_run_parser.add_argument(
-        "--qemu-bin-name",
-        type=str,
-        help="QEMU binary to use",
-        default=set_default("qemu-system-x86_64"),
-    )
-    common_run_parser.add_argument(
-        "--qmp-timeout",
-        type=int,
-        default=set_default(qemu.QMP_DEFAULT_TIMEOUT),
-        help="The time in seconds to wait for the QEMU QMP connection to be established",
-    )
-    common_run_parser.add_argument(
-        "--shared-folder",
-        "-s",
-        action="append",
-        type=str,
-        default=set_default([]),
-        help="Share a host directory with the guest (/path/on/host:/path/on/guest)",
-    )
-    common_run_parser.add_argument(
-        "--config", type=str, help="Path to a config toml file to read parameters from"
-    )
-
-    # Common arguments for single runs of a vm (e.g., start/run but not create)
-    common_oneshot_parser = argparse.ArgumentParser(add_help=False)
-    common_oneshot_parser.add_argument(
-        "--copy-in-before",
-        "-b",
-        type=str,
-        action="append",
-        default=set_default([]),
-        help="Copy a file or directory into the VM before running "
-        + "(path/on/host:/absolute/path/on/guest)",
-    )
-    common_oneshot_parser.add_argument(
-        "--copy-out-after",
-        "-a",
-        type=str,
-        action="append",
-        default=set_default([]),
-        help="Copy a file or directory out of the VM after running "
-        + "(/absolute/path/on/VM:path/on/host)",
-    )
-    common_oneshot_parser.add_argument(
-        "--copy-timeout",
-        type=int,
-        help="The maximum time to wait for a copy-in-before or copy-out-after operation to complete",
-    )
-    common_oneshot_parser.add_argument(
-        "--rsync",
-        action="store_const",
-        const=True,
-        help="Use rsync for copy-in-before/copy-out-after operations",
-    )
-
-    # Common arguments for creation of a vm (e.g., create/run but not start)
-    common_create_parser = argparse.ArgumentParser(add_help=False)
-    common_create_parser.add_argument(
-        "--extra-image",
-        action="append",
-        type=str,
-        default=set_default([]),
-        help="Add an extra disk image to the VM",
-    )
+    Like all of transient's parsers, arguments default to 'SUPPRESS' (see _defaults),
+    and the help is formatted with TransientArgumentDefaultsHelpFormatter.
+    """
 
+    def __init__(
+        self,
+        *args: Any,
+        arguments: "_ArgumentTable" = (),
+        populate: Optional[Callable[[argparse.ArgumentParser], None]] = None,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("argument_default", argparse.SUPPRESS)
+        kwargs.setdefault("formatter_class", TransientArgumentDefaultsHelpFormatter)
+        super().__init__(*args, **kwargs)
+        self.__pending_arguments = arguments
+        self.__pending_populate = populate
+        self.__populated = False
+
+    def populate(self) -> "LazyArgumentParser":
+        if self.__populated is False:
+            self.__populated = True
+            _add_arguments(self, self.__pending_arguments)
+            if self.__pending_populate is not None:
+                self.__pending_populate(self)
+        return self
+
+    def parse_known_args(  # type: ignore
+        self, args: Optional[Sequence[str]] = None, namespace: Any = None
+    ) -> Tuple[argparse.Namespace, List[str]]:
+        return super(LazyArgumentParser, self.populate()).parse_known_args(
+            args, namespace
+        )
+
+    def format_usage(self) -> str:
+        return super(LazyArgumentParser, self.populate()).format_usage()
+
+    def format_help(self) -> str:
+        return super(LazyArgumentParser, self.populate()).format_help()
+
+
+# The arguments shared by several subcommands, as tables of the flags and keyword
+# arguments to pass to 'add_argument'. They are added to each subcommand's parser
+# directly, rather than copied from parent parsers.
+_ArgumentTable = Tuple[Tuple[Tuple[str, ...], Dict[str, Any]], ...]
+
+# Arguments used for all subcommands. The 'SUPPRESS' default also means a subcommand's
+# '--verbose' won't override the flag passed earlier in the command line.
+_COMMON_ARGS: _ArgumentTable = (
+    (("--verbose", "-v"), {"action": "count", "help": "Verbosity level for logging"}),
+    (
+        ("--vmstore",),
+        {"type": str, "help": "Location to place VM images and configuration files"},
+    ),
+    (
+        ("--image-backend",),
+        {
+            "type": str,
+            "help": "Location to place the shared, read-only backing disk images",
+        },
+    ),
+)
+
+# Arguments for commands that use SSH in some way
+_COMMON_SSH_ARGS: _ArgumentTable = (
+    (("--ssh-user",), {"type": str, "help": "User to pass to SSH"}),
+    (("--ssh-bin-name",), {"type": str, "help": "SSH binary to use"}),
+    (
+        ("--ssh-timeout",),
+        {"type": int, "help": "Time to wait for SSH connection before failing"},
+    ),
+    (
+        ("--ssh-command", "--cmd"),
+        {"type": str, "help": "Run an ssh command instead of a console"},
+    ),
+    (
+        ("--ssh-option", "-o"),
+        {"type": str, "action": "append", "help": "Pass an option to SSH"},
+    ),
+)
+
+# Arguments for all vm running features (e.g., create/start/run)
+_COMMON_RUN_ARGS: _ArgumentTable = _COMMON_SSH_ARGS + _COMMON_ARGS + (
+    (
+        ("--ssh-console", "--ssh"),
+        {
+            "action": "store_const",
+            "const": True,
+            "help": "Use an ssh connection instead of the serial console",
+        },
+    ),
+    (
+        ("--ssh-with-serial", "--sshs"),
+        {
+            "action": "store_const",
+            "const": True,
+            "help": "Show the serial output before SSH connects (implies --ssh)",
+        },
+    ),
+    (("--sftp-bin-name",), {"type": str, "help": "SFTP server binary to use"}),
+    (
+        ("--ssh-port",),
+        {"type": int, "help": "Host port the guest port 22 is connected to"},
+    ),
+    (
+        ("--ssh-net-driver",),
+        {
+            "type": str,
+            "help": "The QEMU virtual network device driver e.g. e1000, rtl8139, virtio-net-pci",
+        },
+    ),
+    (
+        ("--no-virtio-scsi",),
+        {
+            "action": "store_const",
+            "const": True,
+            "help": "Use the QEMU default drive interface (ide) instead of virtio-pci-scsi",
+        },
+    ),
+    (
+        ("--shutdown-timeout",),
+        {
+            "type": int,
+            "help": "The time in seconds to wait for shutdown before terminating QEMU",
+        },
+    ),
+    (("--qemu-bin-name",), {"type": str, "help": "QEMU binary to use"}),
+    (
+        ("--qmp-timeout",),
+        {
+            "type": int,
+            "help": "The time in seconds to wait for the QEMU QMP connection to be established",
+        },
+    ),
+    (
+        ("--shared-folder", "-s"),
+        {
+            "action": "append",
+            "type": str,
+            "help": "Share a host directory with the guest (/path/on/host:/path/on/guest)",
+        },
+    ),
+    (
+        ("--config",),
+        {"type": str, "help": "Path to a config toml file to read parameters from"},
+    ),
+)
+
+# Arguments for single runs of a vm (e.g., start/run but not create)
+_COMMON_ONESHOT_ARGS: _ArgumentTable = (
+    (
+        ("--copy-in-before", "-b"),
+        {
+            "type": str,
+            "action": "append",
+            "help": "Copy a file or directory into the VM before running "
+            + "(path/on/host:/absolute/path/on/guest)",
+        },
+    ),
+    (
+        ("--copy-out-after", "-a"),
+        {
+            "type": str,
+            "action": "append",
+            "help": "Copy a file or directory out of the VM after running "
+            + "(/absolute/path/on/VM:path/on/host)",
+        },
+    ),
+    (
+        ("--copy-timeout",),
+        {
+            "type": int,
+            "help": "The maximum time to wait for a copy-in-before or copy-out-after operation to complete",
+        },
+    ),
+    (
+        ("--rsync",),
+        {
+            "action": "store_const",
+            "const": True,
+            "help": "Use rsync for copy-in-before/copy-out-after operations",
+        },
+    ),
+)
+
+# Arguments for creation of a vm (e.g., create/run but not start)
+_COMMON_CREATE_ARGS: _ArgumentTable = (
+    (
+        ("--extra-image",),
+        {"action": "append", "type": str, "help": "Add an extra disk image to the VM"},
+    ),
+)
+
+
+def _add_arguments(parser: argparse.ArgumentParser, table: _ArgumentTable) -> None:
+    for flags, kwargs in table:
+        parser.add_argument(*flags, **kwargs)
+
+
+def define_parsers() -> Tuple[
+    argparse.ArgumentParser, Dict[Tuple[str, ...], argparse.ArgumentParser]
+]:
     root_parser = argparse.ArgumentParser(
         prog="transient",
         parents=[],
         formatter_class=TransientArgumentDefaultsHelpFormatter,
+        argument_default=argparse.SUPPRESS,
     )
     root_parser.add_argument(
         "--version", action="version", version=f"{root_parser.prog} {__version__}"
@@ -202,198 +286,219 @@ def define_parsers(include_defaults: bool) -> Tuple[argparse.ArgumentParser, ...
     root_parser.add_argument(
         "--verbose", "-v", action="count", default=0, help="Verbosity level for logging"
     )
-    subparsers = root_parser.add_subparsers(dest="root_command")
+    subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]"
+    subparsers = root_parser.add_subparsers(
+        dest="root_command", parser_class=LazyArgumentParser
+    )
+    subparsers.required = True
+
+    # The 'create' and 'run' subcommands take the same positional arguments
+    def populate_create_or_run(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("image", help="Disk image to boot", type=str)
+        parser.add_argument("--name", help="Virtual machine name", type=str)
+        parser.add_argument("--qemu_args", help=argparse.SUPPRESS, nargs="*", type=str)
 
     # Define 'create' subcommand
     create_parser = subparsers.add_parser(
         "create",
-        parents=[common_run_parser, common_create_parser],
+        arguments=_COMMON_RUN_ARGS + _COMMON_CREATE_ARGS,
         help="Create (but do not start) a new VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        populate=populate_create_or_run,
     )
-    create_parser.add_argument("image", help="Disk image to boot", type=str)
-    create_parser.add_argument("--name", help="Virtual machine name", type=str)
-    create_parser.add_argument("--qemu_args", help=argparse.SUPPRESS, nargs="*", type=str)
 
     # Define 'run' subcommand
     run_parser = subparsers.add_parser(
         "run",
-        parents=[common_run_parser, common_oneshot_parser, common_create_parser],
+        arguments=_COMMON_RUN_ARGS + _COMMON_ONESHOT_ARGS + _COMMON_CREATE_ARGS,
         help="Create and run a VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        populate=populate_create_or_run,
     )
-    run_parser.add_argument("image", help="Disk image to boot", type=str)
-    run_parser.add_argument("--name", help="Virtual machine name", type=str)
-    run_parser.add_argument("--qemu_args", help=argparse.SUPPRESS, nargs="*", type=str)
 
     # Define 'start' subcommand
     # This subcommand must _not_ have any defaults, as we will combine the user provided
     # values with the ones used during 'create' and we must be able to distinguish between
     # a user-supplied value that happens to be the default, and a value not supplied
     # by the user.
+    def populate_start(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("name", help="Virtual machine name", type=str)
+        parser.add_argument("--qemu_args", help=argparse.SUPPRESS, nargs="*", type=str)
+
     start_parser = subparsers.add_parser(
         "start",
-        parents=[common_run_parser, common_oneshot_parser],
+        arguments=_COMMON_RUN_ARGS + _COMMON_ONESHOT_ARGS,
         help="Start a previously created VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        populate=populate_start,
     )
-    start_parser.add_argument("name", help="Virtual machine name", type=str)
-    start_parser.add_argument("--qemu_args", help=argparse.SUPPRESS, nargs="*", type=str)
 
     # Define 'rm' subcommand
+    def populate_rm(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--force",
+            "-f",
+            help="Force removal. Will stop the VM if currently running",
+            action="store_const",
+            const=True,
+        )
+        parser.add_argument("name", help="Virtual machine name", nargs="+")
+
     rm_parser = subparsers.add_parser(
-        "rm",
-        parents=[common_parser],
-        help="Remove a created VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    rm_parser.add_argument(
-        "--force",
-        "-f",
-        help="Force removal. Will stop the VM if currently running",
-        action="store_const",
-        const=True,
+        "rm", arguments=_COMMON_ARGS, help="Remove a created VM", populate=populate_rm,
     )
-    rm_parser.add_argument("name", help="Virtual machine name", nargs="+")
 
     # Define 'stop' subcommand
+    def populate_stop(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--kill",
+            "-k",
+            help="Send SIGKILL instead of SIGTERM",
+            action="store_const",
+            const=True,
+        )
+        parser.add_argument("name", help="Virtual machine name", nargs="+")
+
     stop_parser = subparsers.add_parser(
-        "stop",
-        parents=[common_parser],
-        help="Stop a running VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    stop_parser.add_argument(
-        "--kill",
-        "-k",
-        help="Send SIGKILL instead of SIGTERM",
-        action="store_const",
-        const=True,
+        "stop", arguments=_COMMON_ARGS, help="Stop a running VM", populate=populate_stop,
     )
-    stop_parser.add_argument("name", help="Virtual machine name", nargs="+")
 
     # Define 'ssh' subcommand
+    def populate_ssh(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--wait",
+            "-w",
+            action="store_const",
+            const=True,
+            help="Wait for at most 'ssh-timeout' for a vm with the given name to exist",
+        )
+        parser.add_argument("name", help="Virtual machine name")
+
     ssh_parser = subparsers.add_parser(
         "ssh",
-        parents=[common_parser, common_ssh_parser],
+        arguments=_COMMON_ARGS + _COMMON_SSH_ARGS,
         help="SSH to a running VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        populate=populate_ssh,
     )
-    ssh_parser.add_argument(
-        "--wait",
-        "-w",
-        action="store_const",
-        const=True,
-        help="Wait for at most 'ssh-timeout' for a vm with the given name to exist",
-    )
-    ssh_parser.add_argument("name", help="Virtual machine name")
 
     # Define 'ps' subcommand
+    def populate_ps(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "-a",
+            "--all",
+            action="store_const",
+            const=True,
+            help="Show all VMs, default is show only running VMs",
+        )
+        parser.add_argument(
+            "--ssh",
+            action="store_const",
+            const=True,
+            help="Print whether VMs have SSH support",
+        )
+        parser.add_argument(
+            "--pid", action="store_const", const=True, help="Print running VMs PID"
+        )
+
     ps_parser = subparsers.add_parser(
         "ps",
-        parents=[common_parser],
+        arguments=_COMMON_ARGS,
         help="Print information about VMs",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    ps_parser.add_argument(
-        "-a",
-        "--all",
-        action="store_const",
-        const=True,
-        help="Show all VMs, default is show only running VMs",
-    )
-    ps_parser.add_argument(
-        "--ssh",
-        action="store_const",
-        const=True,
-        help="Print whether VMs have SSH support",
-    )
-    ps_parser.add_argument(
-        "--pid", action="store_const", const=True, help="Print running VMs PID"
+        populate=populate_ps,
     )
 
+    def populate_commit(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "vm", help="VM to use as the source of the new image", type=str
+        )
+        parser.add_argument("name", help="Name of the new image", type=str)
+
     commit_parser = subparsers.add_parser(
         "commit",
-        parents=[common_parser],
+        arguments=_COMMON_ARGS,
         help="Create a new disk image from the state of a current VM",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        populate=populate_commit,
     )
-    commit_parser.add_argument(
-        "vm", help="VM to use as the source of the new image", type=str
-    )
-    commit_parser.add_argument("name", help="Name of the new image", type=str)
 
     # Define 'image' subcommands
-    image_parser = subparsers.add_parser(
-        "image",
-        parents=[],
-        help="Print information about images",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+    image_parser = subparsers.add_parser("image", help="Print information about images",)
+    image_subparsers: "argparse._SubParsersAction[argparse.ArgumentParser]"
+    image_subparsers = image_parser.add_subparsers(
+        dest="image_command", parser_class=LazyArgumentParser
     )
-    image_subparsers = image_parser.add_subparsers(dest="image_command")
     image_subparsers.required = True
 
     # Define 'image ls' subcommand
     image_ls_parser = image_subparsers.add_parser(
-        "ls",
-        parents=[common_parser],
-        help="Print information about images",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
+        "ls", arguments=_COMMON_ARGS, help="Print information about images",
     )
 
     # Define 'image build' subcommand
+    def populate_image_build(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "build_dir",
+            metavar="build-dir",
+            help="Directory use as root of build",
+            type=str,
+        )
+        parser.add_argument(
+            "--file", "-f", help="Specify a path to the Imagefile", type=str
+        )
+        parser.add_argument("--name", help="Name of new disk", type=str)
+        parser.add_argument(
+            "--qmp-timeout",
+            type=int,
+            help="The time in seconds to wait for the QEMU QMP connection to be established",
+        )
+        parser.add_argument(
+            "--ssh-timeout",
+            type=int,
+            help="Time to wait for SSH connection before failing",
+        )
+        parser.add_argument(
+            "--local",
+            action="store_const",
+            const=True,
+            help="Produce image in the build-dir instead of the backend",
+        )
+
     image_build_parser = image_subparsers.add_parser(
         "build",
-        parents=[common_parser],
+        arguments=_COMMON_ARGS,
         help="Build a new image",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    image_build_parser.add_argument(
-        "build_dir", metavar="build-dir", help="Directory use as root of build", type=str
-    )
-    image_build_parser.add_argument(
-        "--file", "-f", help="Specify a path to the Imagefile", type=str
-    )
-    image_build_parser.add_argument("--name", help="Name of new disk", type=str)
-    image_build_parser.add_argument(
-        "--qmp-timeout",
-        type=int,
-        default=set_default(qemu.QMP_DEFAULT_TIMEOUT),
-        help="The time in seconds to wait for the QEMU QMP connection to be established",
-    )
-    image_build_parser.add_argument(
-        "--ssh-timeout",
-        type=int,
-        default=set_default(ssh.SSH_DEFAULT_TOTAL_TIMEOUT),
-        help="Time to wait for SSH connection before failing",
-    )
-    image_build_parser.add_argument(
-        "--local",
-        action="store_const",
-        const=True,
-        help="Produce image in the build-dir instead of the backend",
+        populate=populate_image_build,
     )
 
     # Define 'image rm' subcommand
+    def populate_image_rm(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("name", help="Image name", nargs="+")
+        parser.add_argument(
+            "--force",
+            "-f",
+            help="Force removal even if image is required by a VM",
+            action="store_const",
+            const=True,
+        )
+
     image_rm_parser = image_subparsers.add_parser(
         "rm",
-        parents=[common_parser],
+        arguments=_COMMON_ARGS,
         help="Remove an image from the backend",
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    image_rm_parser.add_argument("name", help="Image name", nargs="+")
-    image_rm_parser.add_argument(
-        "--force",
-        "-f",
-        help="Force removal even if image is required by a VM",
-        action="store_const",
-        const=True,
+        populate=populate_image_rm,
     )
 
     # Define 'cp' subcommand
+    def populate_cp(parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("path", nargs="+", help="The path to copy to/from")
+        parser.add_argument("--qmp-timeout", type=int, help=argparse.SUPPRESS)
+        parser.add_argument("--ssh-timeout", type=int, help=argparse.SUPPRESS)
+        parser.add_argument(
+            "--rsync",
+            action="store_const",
+            const=True,
+            help="Use rsync for copy operations (instead of SCP)",
+        )
+
     cp_parser = subparsers.add_parser(
         "cp",
-        parents=[common_parser],
+        arguments=_COMMON_ARGS,
         description="""
     Copy files to/from an offline VM. The VM name must be specified
     before the path portion of either the destination or source. For
@@ -408,46 +513,43 @@ def define_parsers(include_defaults: bool) -> Tuple[argparse.ArgumentParser, ...
         transient cp file1 file2 MY_VM_NAME:/tmp
 
     """,
-        formatter_class=TransientArgumentDefaultsHelpFormatter,
-    )
-    cp_parser.add_argument("path", nargs="+", help="The path to copy to/from")
-    cp_parser.add_argument(
-        "--qmp-timeout",
-        type=int,
-        default=set_default(qemu.QMP_DEFAULT_TIMEOUT),
-        help=argparse.SUPPRESS,
+        populate=populate_cp,
     )
-    cp_parser.add_argument(
-        "--ssh-timeout",
-        type=int,
-        default=set_default(ssh.SSH_DEFAULT_TOTAL_TIMEOUT),
-        help=argparse.SUPPRESS,
-    )
-    cp_parser.add_argument(
-        "--rsync",
-        action="store_const",
-        const=True,
-        help="Use rsync for copy operations (instead of SCP)",
+
+    # The parser for each (sub)command, by the names used to select it on the command line
+    command_parsers: Dict[Tuple[str, ...], argparse.ArgumentParser] = {
+        (name,): parser for name, parser in subparsers.choices.items()
+    }
+    command_parsers.update(
+        (("image", name), parser) for name, parser in image_subparsers.choices.items()
     )
+    return root_parser, command_parsers
+
 
-    return (root_parser, run_parser, create_parser, start_parser, image_build_parser)
+ROOT_PARSER, COMMAND_PARSERS = define_parsers()
+RUN_PARSER = COMMAND_PARSERS[("run",)]
+CREATE_PARSER = COMMAND_PARSERS[("create",)]
+START_PARSER = COMMAND_PARSERS[("start",)]
+IMAGE_BUILD_PARSER = COMMAND_PARSERS[("image", "build")]
 
 
-(
-    ROOT_PARSER,
-    RUN_PARSER,
-    CREATE_PARSER,
-    START_PARSER,
-    IMAGE_BUILD_PARSER,
-) = define_parsers(include_defaults=True)
+def parser_defaults(parser: argparse.ArgumentParser) -> Dict[str, Any]:
+    """Returns the default value of each argument accepted by the given parser"""
+    if isinstance(parser, LazyArgumentParser):
+        parser.populate()
+    defaults = _defaults()
+    return {
+        action.dest: _materialize_default(defaults.get(action.dest))
+        for action in parser._actions
+        if action.dest not in (argparse.SUPPRESS, "help")
+    }
 
-(
-    ROOT_PARSER_NO_DEFAULTS,
-    RUN_PARSER_NO_DEFAULTS,
-    CREATE_PARSER_NO_DEFAULTS,
-    START_PARSER_NO_DEFAULTS,
-    IMAGE_BUILD_PARSER_NO_DEFAULTS,
-) = define_parsers(include_defaults=False)
+
+def _materialize_default(default: Any) -> Any:
+    # Each caller gets its own list, so modifying it can't change the defaults
+    if isinstance(default, tuple):
+        return list(default)
+    return default
 
 
 class TransientArgs:
@@ -462,43 +564,41 @@ class TransientArgs:
         self,
         transient_args: List[str],
         qemu_args: List[str],
-        command_mappings: Dict[Any, Any],
+        command_mappings: Dict[Tuple[str, ...], Tuple[Callable[..., None], bool]],
     ) -> None:
 
         self.transient_args = transient_args
         self.qemu_args = qemu_args
-        self.parsed = ROOT_PARSER.parse_args(self.transient_args)
-        self.user_supplied = ROOT_PARSER_NO_DEFAULTS.parse_args(self.transient_args)
-        self.verbosity = self.parsed.verbose
+        self.user_supplied = ROOT_PARSER.parse_args(self.transient_args)
+
+        # The selected command is stored in a field named 'root_command' and, for
+        # commands with subcommands, the subcommand in '<command>_command'. Both are
+        # needed to find the callback, as some subcommands have the same name as
+        # sub-subcommands (e.g., 'rm' and 'image rm'.)
+        command: Tuple[str, ...] = (self.user_supplied.root_command,)
+        del self.user_supplied.root_command
+        if command not in command_mappings:
+            subcommand_field = f"{command[0]}_command"
+            command += (vars(self.user_supplied).pop(subcommand_field, None),)
+
+        if command not in command_mappings:
+            raise utils.TransientError(msg="Unable to locate command callback")
+        callback, needs_qemu = command_mappings[command]
 
-        self.__remove_arg("verbose")
+        # The user supplied arguments only contain what was actually passed, so
+        # fill in the defaults for everything else the command accepts
+        self.parsed = argparse.Namespace(
+            **{**parser_defaults(COMMAND_PARSERS[command]), **vars(self.user_supplied)}
+        )
+        self.verbosity = self.parsed.verbose or 0
 
-        # Starting with a field named 'root_command', recursively look through the
-        # command_mappings object to find the appropriate callback. This is required
-        # because some subcommands have the same name as sub-subcommands (e.g., 'rm'
-        # and 'image rm'.)
-        callback = None
-        mapping: Any = command_mappings
-        field = "root_command"
-        while True:
-            name = getattr(self.parsed, field)
-            value = mapping[name]
-            self.__remove_arg(field)
-
-            if isinstance(value, tuple):
-                callback, needs_qemu = value
-                break
-            else:
-                mapping = value
-                field = name + "_command"
+        self.__remove_arg("verbose")
 
         if needs_qemu is True:
             # The 'hidden' field should never contain actual values, replace them
             # with what we parsed ourselves
             self.__add_arg("qemu_args", qemu_args)
 
-        if callback is None:
-            raise utils.TransientError(msg="Unable to locate command callback")
         self.callback = callback
 
     def __getattr__(self, name: str) -> Any:
@@ -506,19 +606,19 @@ class TransientArgs:
 
     def __remove_arg(self, name: str) -> None:
         delattr(self.parsed, name)
-        delattr(self.user_supplied, name)
+        if hasattr(self.user_supplied, name):
+            delattr(self.user_supplied, name)
 
     def __add_arg(self, name: str, value: Any) -> None:
         setattr(self.parsed, name, value)
         setattr(self.user_supplied, name, value)
 
     def is_user_set(self, name: str) -> bool:
-        if hasattr(self.user_supplied, name):
-            return self.user_supplied.name is not None
-        return False
+        # The user supplied namespace only contains arguments that were actually passed
+        return name in vars(self.user_supplied)
 
     def user_supplied_fields(self) -> Iterator[Tuple[Any, Any]]:
-        return iter(vars(self.user_supplied).items())
+        return iter(self.user_supplied.__dict__.items())
 
     def __iter__(self) -> Iterator[Tuple[Any, Any]]:
-        return iter(vars(self.parsed).items())
+        return iter(self.parsed.__dict__.items())
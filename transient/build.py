@@ -1,4 +1,5 @@
 import enum
+import functools
 import os
 import lark  # type: ignore
 import logging
@@ -15,12 +16,14 @@ from . import ssh
 from typing import (
     Sequence,
     Callable,
+    Dict,
     List,
     Optional,
     TypeVar,
     Type,
     Tuple,
     Union,
+    cast,
 )
 
 
@@ -69,7 +72,12 @@ COMMENT: /#[^\n]*/
 %ignore COMMENT
 %ignore /\\[\t \f]*\r?\n/   // LINE_CONT
 """
-IMAGEFILE_PARSER = lark.Lark(IMAGEFILE_GRAMMAR, parser="lalr").parse
+
+
+@functools.lru_cache(maxsize=None)
+def _imagefile_parser() -> lark.Lark:
+    # Building the LALR tables is only worth doing when an Imagefile is parsed
+    return lark.Lark(IMAGEFILE_GRAMMAR, parser="lalr")
 
 
 class GuestChrootCommand(editor.GuestCommand):
@@ -133,8 +141,12 @@ class CopyInstruction(ImageInstruction):
     destination: str
 
     def __init__(self, ast: lark.tree.Tree) -> None:
-        self.source = [node.children[0].value for node in ast.find_data("copy_source")]
-        self.destination = next(ast.find_data("copy_destination")).children[0].value
+        self.source = []
+        for node in ast.children:
+            if node.data == "copy_source":
+                self.source.append(node.children[0].value)
+            elif node.data == "copy_destination":
+                self.destination = node.children[0].value
 
     def commands(self, builder: "ImageBuilder") -> Sequence[editor.Command]:
         commands = []
@@ -160,8 +172,12 @@ class AddInstruction(ImageInstruction):
     destination: str
 
     def __init__(self, ast: lark.tree.Tree) -> None:
-        self.source = [node.children[0].value for node in ast.find_data("add_source")]
-        self.destination = next(ast.find_data("add_destination")).children[0].value
+        self.source = []
+        for node in ast.children:
+            if node.data == "add_source":
+                self.source.append(node.children[0].value)
+            elif node.data == "add_destination":
+                self.destination = node.children[0].value
 
     def __is_compressed(self, name: str) -> bool:
         return name.endswith(".tar.gz") or name.endswith(".tar.xz")
@@ -206,14 +222,8 @@ class DiskInstruction(ImageInstruction):
         self.units = ast.children[1].value.upper().replace("B", "")
         self.type = ast.children[2].value.upper()
 
-    def commands(self, builder: "ImageBuilder") -> Sequence[editor.Command]:
-        return [
-            editor.GuestCommand(
-                f"echo label:{self.type} | sfdisk /dev/sda",
-                builder.image_editor.ssh_config,
-                builder.config.ssh_timeout,
-            )
-        ]
+    def sfdisk_header(self) -> str:
+        return f"label:{self.type}"
 
     def __str__(self) -> str:
         return f"DISK {self.size}{self.units} {self.type}"
@@ -230,28 +240,35 @@ class PartitionInstruction(ImageInstruction):
     def __init__(self, ast: lark.tree.Tree) -> None:
         self.number = int(ast.children[0].value)
 
-        format = next(ast.find_data("partition_format"), None)
+        # The optional clauses are direct children of the partition node, so
+        # collect them in a single pass rather than searching for each one.
+        clauses = {
+            child.data: child
+            for child in ast.children
+            if isinstance(child, lark.tree.Tree)
+        }
+
+        format = clauses.get("partition_format")
         if format is not None:
             self.format = format.children[0].value.lower()
             if self.format not in self.__supported_formats():
                 raise RuntimeError(f"Unsupported partition format '{self.format}'")
 
-            options = next(ast.find_data("partition_options"), None)
-            if options is not None:
-                self.options = options.children[0].value.strip('"')
+            if len(format.children) > 1:
+                self.options = format.children[1].children[0].value.strip('"')
             else:
                 self.options = ""
         else:
             self.format = None
             self.options = ""
 
-        mount = next(ast.find_data("partition_mount"), None)
+        mount = clauses.get("partition_mount")
         if mount is not None:
             self.mount = mount.children[0].value
         else:
             self.mount = None
 
-        size = next(ast.find_data("partition_size"), None)
+        size = clauses.get("partition_size")
         if size is not None:
             self.units = size.children[1].value.upper()
             self.size = int(size.children[0].value)
@@ -259,7 +276,7 @@ class PartitionInstruction(ImageInstruction):
             self.units = None
             self.size = None
 
-        flags = next(ast.find_data("partition_flags"), None)
+        flags = clauses.get("partition_flags")
         if flags is not None:
             self.flags = [child.value.lower() for child in flags.children]
         else:
@@ -268,7 +285,7 @@ class PartitionInstruction(ImageInstruction):
     def __supported_formats(self) -> List[str]:
         return ["ext2", "ext3", "ext4", "xfs"]
 
-    def commands(self, builder: "ImageBuilder") -> Sequence[editor.Command]:
+    def sfdisk_entry(self) -> str:
         partition_cmd = ""
         if self.size is not None:
             partition_cmd += f"size={self.size}{self.units},"
@@ -290,24 +307,12 @@ class PartitionInstruction(ImageInstruction):
         if has_type is False:
             partition_cmd += "type=L,"
 
-        commands = [
-            editor.GuestCommand(
-                f"echo '{partition_cmd}' | sfdisk /dev/sda -a",
-                builder.image_editor.ssh_config,
-                builder.config.ssh_timeout,
-            )
-        ]
+        return partition_cmd
 
-        if self.format is not None:
-            commands.append(
-                editor.GuestCommand(
-                    f"mkfs.{self.format} {self.options} /dev/sda{self.number}",
-                    builder.image_editor.ssh_config,
-                    builder.config.ssh_timeout,
-                )
-            )
-
-        return commands
+    def format_command(self) -> Optional[str]:
+        if self.format is None:
+            return None
+        return f"mkfs.{self.format} {self.options} /dev/sda{self.number}"
 
     def __str__(self) -> str:
         output = f"PARTITION {self.number} "
@@ -336,24 +341,57 @@ class FromInstruction(ImageInstruction):
         return f"FROM {self.source}"
 
 
+def _partition_commands(
+    disk: DiskInstruction, partitions: List[PartitionInstruction]
+) -> List[str]:
+    """Returns the guest commands to partition and format a disk built from scratch
+
+    The whole layout is a single sfdisk script, so it can run in the same guest
+    command as the formatting. Each partition is announced before it is formatted,
+    so the output shows which one a failure belongs to.
+    """
+    sfdisk_script = [disk.sfdisk_header()] + [
+        instr.sfdisk_entry() for instr in partitions
+    ]
+    commands = [
+        "printf '%s\\n' {} | sfdisk /dev/sda".format(
+            " ".join(f"'{line}'" for line in sfdisk_script)
+        )
+    ]
+    for instr in partitions:
+        format_command = instr.format_command()
+        if format_command is None:
+            continue
+        # The guest has no udev to settle, so wait (for up to 5 seconds) for the
+        # kernel to create the partition's device node before formatting it
+        device = f"/dev/sda{instr.number}"
+        commands.append(f"echo 'Formatting partition {instr.number} ({device})'")
+        commands.append(
+            f"(i=0; while [ ! -b {device} ] && [ $i -lt 50 ]; do "
+            "sleep 0.1; i=$((i + 1)); done)"
+        )
+        commands.append(format_command)
+    return commands
+
+
+_INSTRUCTION_TYPES: Dict[str, Callable[[lark.tree.Tree], ImageInstruction]] = {
+    "run": RunInstruction,
+    "inspect": InspectInstruction,
+    "copy": CopyInstruction,
+    "add": AddInstruction,
+    "disk": DiskInstruction,
+    "partition": PartitionInstruction,
+    "from": FromInstruction,
+}
+
+
 def _build_instruction(ast: lark.tree.Tree) -> ImageInstruction:
     cmd = ast.children[0]
-    if cmd.data == "run":
-        return RunInstruction(cmd)
-    elif cmd.data == "inspect":
-        return InspectInstruction(cmd)
-    elif cmd.data == "copy":
-        return CopyInstruction(cmd)
-    elif cmd.data == "add":
-        return AddInstruction(cmd)
-    elif cmd.data == "disk":
-        return DiskInstruction(cmd)
-    elif cmd.data == "partition":
-        return PartitionInstruction(cmd)
-    elif cmd.data == "from":
-        return FromInstruction(cmd)
-    else:
+    try:
+        instruction_type = _INSTRUCTION_TYPES[cmd.data]
+    except KeyError:
         raise RuntimeError(f"Unsupported build instruction: '{cmd.data}'")
+    return instruction_type(cmd)
 
 
 T = TypeVar("T")
@@ -385,16 +423,20 @@ class ImageBuilder:
         with open(imagefile_path, "r") as file:
             contents = file.read()
 
-            # Until https://github.com/lark-parser/lark/issues/237 is merged in lark,
-            # we can't require instructions end with a newline _or_ EOF, so we
-            # always require a newline. This leads to somewhat confusing errors if
-            # there is no newline at the end of the file.
-            #
-            # So for now, just always append a newline
-            parsed = IMAGEFILE_PARSER(contents + "\n")
-            self.instructions = [
-                _build_instruction(instr) for instr in parsed.find_data("instruction")
-            ]
+        # Until https://github.com/lark-parser/lark/issues/237 is merged in lark,
+        # we can't require instructions end with a newline _or_ EOF, so we
+        # always require a newline. This leads to somewhat confusing errors if
+        # there is no newline at the end of the file.
+        #
+        # So for now, just always append a newline
+        parsed = _imagefile_parser().parse(contents + "\n")
+        self.instructions = [
+            _build_instruction(instr) for instr in parsed.find_data("instruction")
+        ]
+
+        self.__instructions_by_type: Dict[type, List[ImageInstruction]] = {}
+        for instr in self.instructions:
+            self.__instructions_by_type.setdefault(type(instr), []).append(instr)
 
         logging.info("Validating Imagefile")
         self.__validate()
@@ -403,7 +445,9 @@ class ImageBuilder:
         return self.from_instruction.source.lower() == "scratch"
 
     def __instruction_type(self, instr_type: Type[T]) -> List[T]:
-        return [instr for instr in self.instructions if isinstance(instr, instr_type)]
+        # Instruction types are never subclassed, so grouping by exact type
+        # is equivalent to filtering with isinstance
+        return cast(List[T], self.__instructions_by_type.get(instr_type, []))
 
     def __validate(self) -> None:
         from_instructions = self.__instruction_type(FromInstruction)
@@ -472,13 +516,13 @@ class ImageBuilder:
             else:
                 section = ImagefileSection.EXECUTE
 
-    def __print_step(self, instruction: ImageInstruction) -> None:
-        total_steps = len(self.instructions)
-        idx = self.instructions.index(instruction) + 1
-        print(f"Step {idx}/{total_steps} : {instruction}")
+    def __print_step(self, idx: int, instruction: ImageInstruction) -> None:
+        print(f"Step {idx}/{len(self.instructions)} : {instruction}")
 
     def __prepare_new_image(self) -> str:
-        self.__print_step(self.from_instruction)
+        # Validation guarantees FROM is the first instruction, followed by
+        # DISK for images built from scratch
+        self.__print_step(1, self.from_instruction)
 
         name = store.storage_safe_encode(self.config.name)
         if self.config.local is True:
@@ -492,15 +536,13 @@ class ImageBuilder:
             existing = self.imgstore.retrieve_image(self.from_instruction.source).path
             logging.info(f"Copying backend file as base of new image at '{working}'")
             with open(existing, "rb") as source, open(working, "wb") as dest:
-                # Get the size of the source for the progress bar
-                size = source.seek(0, os.SEEK_END)
-                source.seek(0)
-                utils.copy_with_progress(source, dest, size)
+                size = os.fstat(source.fileno()).st_size
+                utils.copy_file_with_progress(source.fileno(), dest.fileno(), size)
         else:
             logging.info(f"Creating new image at '{working}'")
             disk = self.__instruction_type(DiskInstruction)[0]
 
-            self.__print_step(disk)
+            self.__print_step(2, disk)
 
             utils.run_check_retcode(
                 [
@@ -563,15 +605,17 @@ class ImageBuilder:
         return sorted(mountable, key=sort_key)
 
     def __prepare_chroot_early(self) -> None:
-        disk_cmd = self.__instruction_type(DiskInstruction)[0]
-        for cmd in disk_cmd.commands(self):
-            cmd.run()
-
+        disk_instr = self.__instruction_type(DiskInstruction)[0]
         partition_instructions = self.__instruction_type(PartitionInstruction)
-        for partition_instr in partition_instructions:
-            self.__print_step(partition_instr)
-            for cmd in partition_instr.commands(self):
-                cmd.run()
+        # Partition and format in a single guest command, instead of a separate
+        # ssh session per step. That command covers all of the PARTITION steps
+        # (which immediately follow FROM and DISK), so print them all first.
+        for idx, partition_instr in enumerate(partition_instructions, 3):
+            self.__print_step(idx, partition_instr)
+        print("Partitioning and formatting the disk", flush=True)
+        self.image_editor.run_command_in_guest(
+            _partition_commands(disk_instr, partition_instructions)
+        )
 
         # Now that the partitions are created and formatted, mount them in the
         # required order
@@ -587,7 +631,7 @@ class ImageBuilder:
             )
 
     def __is_executable_instruction(self, instr: ImageInstruction) -> bool:
-        return isinstance(instr, RunInstruction) or isinstance(instr, InspectInstruction)
+        return isinstance(instr, (RunInstruction, InspectInstruction))
 
     def __run_command_in_guest_chroot(
         self,
@@ -632,12 +676,10 @@ class ImageBuilder:
         if self.__is_from_scratch():
             self.__prepare_chroot_early()
 
-        for instr in self.instructions:
+        for idx, instr in enumerate(self.instructions, 1):
             # FROM, DISK and PARTITION instructions have already been handled
-            if (
-                isinstance(instr, FromInstruction)
-                or isinstance(instr, DiskInstruction)
-                or isinstance(instr, PartitionInstruction)
+            if isinstance(
+                instr, (FromInstruction, DiskInstruction, PartitionInstruction)
             ):
                 continue
             elif self.__is_executable_instruction(instr) and self.chroot_ready is False:
@@ -646,7 +688,7 @@ class ImageBuilder:
                 # the chroot.
                 self.__prepare_chroot()
 
-            self.__print_step(instr)
+            self.__print_step(idx, instr)
 
             # If this is an inspect instruction, don't try to run anything
             if isinstance(instr, InspectInstruction):
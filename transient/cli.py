@@ -318,21 +318,20 @@ def sigint_handler(sig: int, _frame: Any) -> None:
     sys.exit(1)
 
 
+# The callback for each command, and whether it accepts QEMU arguments
 CLI_COMMAND_MAPPINGS = {
-    "create": (create_impl, True),
-    "run": (run_impl, True),
-    "rm": (rm_impl, False),
-    "ssh": (ssh_impl, False),
-    "start": (start_impl, True),
-    "stop": (stop_impl, False),
-    "ps": (ps_impl, False),
-    "commit": (commit_impl, False),
-    "cp": (cp_impl, False),
-    "image": {
-        "ls": (image_ls_impl, False),
-        "build": (image_build_impl, False),
-        "rm": (image_rm_impl, False),
-    },
+    ("create",): (create_impl, True),
+    ("run",): (run_impl, True),
+    ("rm",): (rm_impl, False),
+    ("ssh",): (ssh_impl, False),
+    ("start",): (start_impl, True),
+    ("stop",): (stop_impl, False),
+    ("ps",): (ps_impl, False),
+    ("commit",): (commit_impl, False),
+    ("cp",): (cp_impl, False),
+    ("image", "ls"): (image_ls_impl, False),
+    ("image", "build"): (image_build_impl, False),
+    ("image", "rm"): (image_rm_impl, False),
 }
 
 
@@ -1,6 +1,12 @@
-import toml
+try:
+    # The parser in the standard library (Python 3.11+) is much faster than
+    # the pure-python 'toml' package, so prefer it when available.
+    from tomllib import loads as toml_loads, TOMLDecodeError as TomlDecodeError
+except ImportError:
+    from toml import loads as toml_loads, TomlDecodeError  # type: ignore
 
 import argparse
+import functools
 import marshmallow
 from marshmallow import Schema, fields, ValidationError
 from typing import (
@@ -22,10 +28,10 @@ class ConfigFileParsingError(Exception):
        configuration file
     """
 
-    inner: toml.TomlDecodeError
+    inner: TomlDecodeError
     path: str
 
-    def __init__(self, error: toml.TomlDecodeError, path: str) -> None:
+    def __init__(self, error: TomlDecodeError, path: str) -> None:
         self.inner = error
         self.path = path
 
@@ -85,7 +91,9 @@ class CLIArgumentError(Exception):
         return msg
 
 
-def schema_from_argument_parser(parser: argparse.ArgumentParser) -> Type[Schema]:
+def schema_from_argument_parser(
+    parser: argparse.ArgumentParser, defaults: Mapping[str, Any]
+) -> Type[Schema]:
     def arg_to_field(arg: argparse.Action) -> fields.Field:
         TYPE_TO_FIELD = {
             int: fields.Int,
@@ -94,13 +102,15 @@ def schema_from_argument_parser(parser: argparse.ArgumentParser) -> Type[Schema]
             float: fields.Float,
         }
 
+        default = defaults.get(arg.dest)
+
         # If no type is specified, use the type of default
         if arg.type is not None:
             assert isinstance(arg.type, type)
             field = TYPE_TO_FIELD[arg.type]
         else:
-            if arg.default is not None:
-                field = TYPE_TO_FIELD[type(arg.default)]
+            if default is not None:
+                field = TYPE_TO_FIELD[type(default)]
             elif arg.const is not None:
                 field = TYPE_TO_FIELD[type(arg.const)]
             else:
@@ -108,9 +118,11 @@ def schema_from_argument_parser(parser: argparse.ArgumentParser) -> Type[Schema]
 
         # If this is an append action, we really want a list of these fields
         if isinstance(arg, argparse._AppendAction) or arg.nargs in ("*", "+"):
-            return fields.List(field, missing=arg.default, allow_none=True)
+            # Load a copy of the default, as loaded lists may be extended later
+            missing: Any = None if default is None else functools.partial(list, default)
+            return fields.List(field, missing=missing, allow_none=True)
 
-        return cast(fields.Field, field(missing=arg.default, allow_none=True))
+        return cast(fields.Field, field(missing=default, allow_none=True))
 
     class_name = "".join([word.capitalize() for word in parser.prog.split()]) + "Schema"
     return cast(
@@ -127,10 +139,19 @@ def schema_from_argument_parser(parser: argparse.ArgumentParser) -> Type[Schema]
     )
 
 
-CreateSchema = schema_from_argument_parser(args.CREATE_PARSER)
-StartSchema = schema_from_argument_parser(args.START_PARSER_NO_DEFAULTS)
-RunSchema = schema_from_argument_parser(args.RUN_PARSER)
-ImageBuildSchema = schema_from_argument_parser(args.IMAGE_BUILD_PARSER)
+@functools.lru_cache(maxsize=None)
+def _shared_schema(parser: argparse.ArgumentParser, with_defaults: bool = True) -> Schema:
+    """Returns a single, shared instance of the schema for the given parser
+
+    Schemas are only built the first time they are needed, as building one
+    requires the parser's arguments to be populated. Loading data doesn't modify
+    a schema, so there is no need to construct a new instance (and all of its
+    fields) for every configuration.
+    """
+    defaults = args.parser_defaults(parser)
+    if with_defaults is False:
+        defaults = dict.fromkeys(defaults)
+    return schema_from_argument_parser(parser, defaults)()
 
 
 class _Config(Dict[str, Any]):
@@ -167,20 +188,22 @@ BuildConfig = NewType("BuildConfig", _Config)
 
 
 def load_create_config(path: str, set_defaults: bool = True) -> CreateConfig:
-    return CreateConfig(__load_config_file(path, CreateSchema(), set_defaults))
+    return CreateConfig(
+        __load_config_file(path, _shared_schema(args.CREATE_PARSER), set_defaults)
+    )
 
 
 def __load_config_file(path: str, schema: Schema, set_defaults: bool) -> _Config:
     contents = open(path, "r").read()
 
     try:
-        parsed_config_file = toml.loads(contents)
+        parsed_config_file = toml_loads(contents)
 
         # Allow the user to write option names in the same form as the commandline
         parsed_config_file = {
             name.replace("-", "_"): value for name, value in parsed_config_file.items()
         }
-    except toml.TomlDecodeError as error:
+    except TomlDecodeError as error:
         raise ConfigFileParsingError(error, path)
 
     try:
@@ -216,19 +239,27 @@ def __create_transient_config(cli_args: args.TransientArgs, schema: Schema) -> _
 
 
 def create_transient_run_config(cli_args: args.TransientArgs) -> RunConfig:
-    return RunConfig(__create_transient_config(cli_args, RunSchema()))
+    return RunConfig(__create_transient_config(cli_args, _shared_schema(args.RUN_PARSER)))
 
 
 def create_transient_start_config(cli_args: args.TransientArgs) -> StartConfig:
-    return StartConfig(__create_transient_config(cli_args, StartSchema()))
+    return StartConfig(
+        __create_transient_config(
+            cli_args, _shared_schema(args.START_PARSER, with_defaults=False)
+        )
+    )
 
 
 def create_transient_create_config(cli_args: args.TransientArgs) -> CreateConfig:
-    return CreateConfig(__create_transient_config(cli_args, CreateSchema()))
+    return CreateConfig(
+        __create_transient_config(cli_args, _shared_schema(args.CREATE_PARSER))
+    )
 
 
 def create_transient_build_config(cli_args: args.TransientArgs) -> BuildConfig:
-    return BuildConfig(_Config(schema=ImageBuildSchema(), data=dict(cli_args)))
+    return BuildConfig(
+        _Config(schema=_shared_schema(args.IMAGE_BUILD_PARSER), data=dict(cli_args))
+    )
 
 
 def run_config_from_create_and_start(
@@ -246,7 +277,7 @@ def run_config_from_create_and_start(
             # what we use in the resulting RunConfig)
             new_config[key] = value
 
-    return RunConfig(_Config(schema=RunSchema(), data=new_config))
+    return RunConfig(_Config(schema=_shared_schema(args.RUN_PARSER), data=new_config))
 
 
 def create_config_from_run(run: RunConfig, name: Optional[str] = None) -> CreateConfig:
@@ -254,7 +285,11 @@ def create_config_from_run(run: RunConfig, name: Optional[str] = None) -> Create
     if name is not None:
         new_cfg["name"] = name
     return CreateConfig(
-        _Config(schema=CreateSchema(), data=new_cfg, unknown=marshmallow.EXCLUDE)
+        _Config(
+            schema=_shared_schema(args.CREATE_PARSER),
+            data=new_cfg,
+            unknown=marshmallow.EXCLUDE,
+        )
     )
 
 
@@ -1,7 +1,10 @@
 import logging
+import os
 import pathlib
 import re
 import subprocess
+import tempfile
+import time
 import types
 
 from . import configuration
@@ -13,8 +16,8 @@ from . import static
 from typing import (
     cast,
     Any,
-    Sequence,
     Callable,
+    IO,
     List,
     Optional,
     Type,
@@ -23,6 +26,10 @@ from typing import (
 )
 
 
+# Seconds to wait for qemu to exit after terminating it, before killing it
+_FAILED_EDIT_KILL_AFTER = 5
+
+
 def combine_commands(cmds: List[str], allowfail: bool) -> str:
     if allowfail is True:
         return "; ".join(cmds)
@@ -105,6 +112,9 @@ class ImageEditor:
     ssh_timeout: int
     qmp_timeout: int
     rsync: bool
+    ssh_control_dir: Optional["tempfile.TemporaryDirectory[str]"]
+    ssh_master: Optional["subprocess.Popen[bytes]"]
+    ssh_master_stderr: Optional[IO[bytes]]
 
     def __init__(
         self,
@@ -119,24 +129,50 @@ class ImageEditor:
         self.skip_mount = skip_mount
         self.qmp_timeout = qmp_timeout
         self.rsync = rsync
+        self.ssh_control_dir = None
+        self.ssh_master = None
+        self.ssh_master_stderr = None
 
     def edit(self) -> "ImageEditor":
         self.runner = self._spawn_qemu(self.path)
-        assert self.runner.qmp_client is not None
-
-        ssh_port = ssh.find_ssh_port_forward(self.runner.qmp_client)
 
-        self.ssh_config = ssh.SshConfig(host="127.0.0.1", port=ssh_port, user="root")
+        # Nothing calls close() if this fails, so clean up the VM (and the ssh
+        # master, if it was started) here. The guest may well be unresponsive, so
+        # don't wait on a graceful shutdown.
+        try:
+            assert self.runner.qmp_client is not None
+            ssh_port = ssh.find_ssh_port_forward(self.runner.qmp_client)
 
-        if self.skip_mount is True:
-            return self
+            self.ssh_config = ssh.SshConfig(host="127.0.0.1", port=ssh_port, user="root")
+            self._start_ssh_master()
 
-        self._prepare_mount()
+            if self.skip_mount is False:
+                self._prepare_mount()
+        except:
+            self._stop_ssh_master()
+            self.runner.terminate(kill_after=_FAILED_EDIT_KILL_AFTER)
+            raise
         return self
 
     def close(self) -> None:
+        self._stop_ssh_master()
         self.runner.shutdown()
 
+    def _stop_ssh_master(self) -> None:
+        if self.ssh_master is not None:
+            if self.ssh_master.poll() is not None:
+                self._log_ssh_master_exit()
+            else:
+                self.ssh_master.terminate()
+                self.ssh_master.wait()
+            self.ssh_master = None
+        if self.ssh_master_stderr is not None:
+            self.ssh_master_stderr.close()
+            self.ssh_master_stderr = None
+        if self.ssh_control_dir is not None:
+            self.ssh_control_dir.cleanup()
+            self.ssh_control_dir = None
+
     def __enter__(self) -> "ImageEditor":
         return self.edit()
 
@@ -149,6 +185,43 @@ class ImageEditor:
         self.close()
         return None
 
+    def _start_ssh_master(self) -> None:
+        # Every guest command is a separate ssh invocation. Keep one connection
+        # open for the life of the editor and have the rest multiplex over it,
+        # instead of negotiating a new session each time. If the master goes
+        # away, ssh falls back to connecting directly.
+        self.ssh_control_dir = tempfile.TemporaryDirectory(prefix="transient-ssh-")
+        control_path = os.path.join(self.ssh_control_dir.name, "control")
+        self.ssh_config.args.extend(["-o", f"ControlPath={control_path}"])
+
+        # Keep the master's errors, so they can be reported if it exits early
+        self.ssh_master_stderr = tempfile.TemporaryFile()
+        client = ssh.SshClient(self.ssh_config)
+        self.ssh_master = client.connect_master(
+            self.ssh_timeout, stderr=self.ssh_master_stderr
+        )
+
+        # Wait for the master to be ready, so the following commands use it
+        deadline = time.monotonic() + self.ssh_timeout
+        while not os.path.exists(control_path):
+            if self.ssh_master.poll() is not None:
+                self._log_ssh_master_exit()
+                self.ssh_master = None
+                return
+            if time.monotonic() > deadline:
+                logging.warning("SSH control master did not start, connecting directly")
+                return
+            time.sleep(0.1)
+
+    def _log_ssh_master_exit(self) -> None:
+        assert self.ssh_master is not None and self.ssh_master_stderr is not None
+        self.ssh_master_stderr.seek(0)
+        stderr = self.ssh_master_stderr.read().decode("utf-8", errors="replace")
+        logging.warning(
+            f"SSH control master exited with code {self.ssh_master.returncode}, "
+            f"connecting directly: {stderr.strip()}"
+        )
+
     def _mount_root(self) -> None:
         """Guess that the root partition is the one with /etc/fstab, and mount
         it at /mnt"""
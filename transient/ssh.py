@@ -84,13 +84,19 @@ class SshClient:
         self.config = config
         self.command = command
 
-    def __prepare_ssh_command(self, user_cmd: Optional[str] = None) -> List[str]:
+    def __prepare_ssh_command(
+        self, user_cmd: Optional[str] = None, master: bool = False
+    ) -> List[str]:
         if self.config.user is not None:
             host = f"{self.config.user}@{self.config.host}"
         else:
             host = self.config.host
 
         args = self.config.args + ["-p", str(self.config.port)]
+        if master is True:
+            # Hold the connection open without running anything, so other
+            # clients can multiplex over it
+            args.extend(["-M", "-N"])
 
         priv_keys = _prepare_builtin_keys()
         for key in priv_keys:
@@ -108,9 +114,10 @@ class SshClient:
         ssh_stdin: Optional[utils.FILE_TYPE] = None,
         ssh_stdout: Optional[utils.FILE_TYPE] = None,
         ssh_stderr: Optional[utils.FILE_TYPE] = None,
+        master: bool = False,
     ) -> "subprocess.Popen[bytes]":
         probe_command = self.__prepare_ssh_command()
-        real_command = self.__prepare_ssh_command(self.command)
+        real_command = self.__prepare_ssh_command(self.command, master)
 
         logging.info("Probing SSH using '{}'".format(" ".join(probe_command)))
 
@@ -178,6 +185,19 @@ class SshClient:
             ssh_stderr=subprocess.PIPE,
         )
 
+    def connect_master(
+        self, timeout: int, stderr: utils.FILE_TYPE = subprocess.DEVNULL
+    ) -> "subprocess.Popen[bytes]":
+        """Start a control master for the configured ControlPath. The connection
+        stays open until the returned process is terminated."""
+        return self.__timed_connection(
+            timeout,
+            ssh_stdin=subprocess.DEVNULL,
+            ssh_stdout=subprocess.DEVNULL,
+            ssh_stderr=stderr,
+            master=True,
+        )
+
     def connect(
         self,
         timeout: int,
@@ -1,5 +1,6 @@
 import collections
 import contextlib
+import functools
 import json
 import logging
 import os
@@ -7,6 +8,7 @@ import progressbar  # type: ignore
 import re
 import requests
 import shutil
+import string
 import tarfile
 import tempfile
 import toml
@@ -26,6 +28,7 @@ from typing import (
     Pattern,
     Iterator,
     NewType,
+    Tuple,
 )
 
 _BLOCK_TRANSFER_SIZE = 64 * 1024  # 64KiB
@@ -34,10 +37,23 @@ _BLOCK_TRANSFER_SIZE = 64 * 1024  # 64KiB
 _BACKEND_IMAGE_REGEX = re.compile(r"^[^\-]+$")
 
 
+# Maps each ASCII character that URL quoting would escape (plus '-') to its
+# escaped form. The remaining characters are left alone by str.translate.
+_STORAGE_SAFE_CHARS = string.ascii_letters + string.digits + "_.~"
+_STORAGE_SAFE_ENCODE_TABLE = str.maketrans(
+    {chr(c): f"%{c:02X}" for c in range(128) if chr(c) not in _STORAGE_SAFE_CHARS}
+)
+
+
 def storage_safe_encode(name: str) -> str:
     # Use URL quote so the names are still somewhat readable in the filesystem, but
     # we can unambiguously get the true name back for display purposes
-    return urllib.parse.quote(name, safe="").replace("-", "%2D")
+    try:
+        name.encode("ascii")
+    except UnicodeEncodeError:
+        # Other characters are quoted as their UTF-8 bytes, so leave them to urllib
+        return urllib.parse.quote(name, safe="").replace("-", "%2D")
+    return name.translate(_STORAGE_SAFE_ENCODE_TABLE)
 
 
 def storage_safe_decode(name: str) -> str:
@@ -240,6 +256,7 @@ class HttpImageProtocol(BaseImageProtocol):
 
 
 _IMAGE_SPEC = re.compile(r"^([^,]+?)(?:,(.+?)=(.+))?$")
+# Vagrant must remain first, as it is used for specs without a protocol
 _IMAGE_PROTOCOLS = [
     VagrantImageProtocol(),
     HttpImageProtocol(),
@@ -247,28 +264,35 @@ _IMAGE_PROTOCOLS = [
 ]
 
 
+@functools.lru_cache(maxsize=256)
+def _parse_image_spec(spec: str) -> Tuple[str, BaseImageProtocol, str]:
+    """Returns the name, source protocol and source of an image spec
+
+    The same specs tend to be parsed repeatedly, so the results are cached.
+    The protocols are shared instances either way.
+    """
+    parsed = _IMAGE_SPEC.match(spec)
+    if parsed is None:
+        raise utils.TransientError(f"Invalid image spec '{spec}'")
+    name, proto, source = parsed.groups()
+
+    # If no protocol is specified, use vagrant
+    if proto is None:
+        return name, _IMAGE_PROTOCOLS[0], name
+
+    for protocol in _IMAGE_PROTOCOLS:
+        if protocol.matches(proto):
+            return name, protocol, source
+    raise utils.TransientError(f"Unknown image source protocol '{proto}'")
+
+
 class ImageSpec:
     name: str
     source_proto: BaseImageProtocol
     source: str
 
     def __init__(self, spec: str) -> None:
-        parsed = _IMAGE_SPEC.match(spec)
-        if parsed is None:
-            raise utils.TransientError(f"Invalid image spec '{spec}'")
-        self.name, proto, self.source = parsed.groups()
-
-        # If no protocol is specified, use vagrant
-        if proto is None:
-            self.source_proto = VagrantImageProtocol()
-            self.source = self.name
-            return
-
-        for protocol in _IMAGE_PROTOCOLS:
-            if protocol.matches(proto):
-                self.source_proto = protocol
-                return
-        raise utils.TransientError(f"Unknown image source protocol '{proto}'")
+        self.name, self.source_proto, self.source = _parse_image_spec(spec)
 
 
 class BaseImageInfo:
@@ -1,6 +1,6 @@
 import bz2
 import contextlib
-import distutils.util
+import errno
 import fcntl
 import logging
 import lzma
@@ -40,6 +40,11 @@ from . import static
 FILE_TYPE = Union[None, int, IO[Any]]
 
 
+# The responses accepted by prompt_yes_no (the same as distutils' strtobool)
+_YES_RESPONSES = frozenset(("y", "yes", "t", "true", "on", "1"))
+_NO_RESPONSES = frozenset(("n", "no", "f", "false", "off", "0"))
+
+
 def prompt_yes_no(prompt: str, default: Optional[bool] = None) -> bool:
     if default is True:
         indicator = "[Y/n]"
@@ -50,23 +55,26 @@ def prompt_yes_no(prompt: str, default: Optional[bool] = None) -> bool:
 
     full_prompt = f"{prompt} {indicator}: "
     while True:
-        try:
-            response = input(full_prompt)
-            if response == "" and default is not None:
-                return default
-            return bool(distutils.util.strtobool(response))
-        except ValueError:
-            print("Please select Y or N")
+        response = input(full_prompt)
+        if response == "" and default is not None:
+            return default
+        response = response.lower()
+        if response in _YES_RESPONSES:
+            return True
+        if response in _NO_RESPONSES:
+            return False
+        print("Please select Y or N")
+
+
+_BYTE_LABELS = ("B", "KiB", "MiB", "GiB", "TiB")
 
 
 def format_bytes(size: float) -> str:
-    power = 2 ** 10
-    n = 0
-    labels = {0: "B", 1: "KiB", 2: "MiB", 3: "GiB", 4: "TiB"}
-    while size >= power:
-        size /= power
-        n += 1
-    return "{:.2f} {}".format(size, labels[n])
+    # Each label covers another 10 bits of the size, so the label can be
+    # picked from the bit length rather than by repeatedly dividing. Sizes
+    # beyond the largest label are shown in that label.
+    n = min((max(int(size), 1).bit_length() - 1) // 10, len(_BYTE_LABELS) - 1)
+    return "{:.2f} {}".format(size / (1 << (10 * n)), _BYTE_LABELS[n])
 
 
 def paths_equal(*paths: str) -> bool:
@@ -142,7 +150,16 @@ def extract_static_file(key: str, destination: str) -> None:
 
 
 def join_absolute_paths(path: str, *paths: str) -> str:
-    return os.path.join(path, *[p.lstrip("/") for p in paths])
+    # This is os.path.join, except that absolute components are nested within
+    # the path so far instead of replacing it. With the leading slashes
+    # stripped, that is just string concatenation.
+    for component in paths:
+        component = component.lstrip("/")
+        if not path or path.endswith("/"):
+            path += component
+        else:
+            path += "/" + component
+    return path
 
 
 def prepare_file_operation_bar(filesize: int) -> progressbar.ProgressBar:
@@ -178,7 +195,8 @@ def lock_file(
     else:
         lock_flags = fcntl.LOCK_EX
 
-    start = time.time()
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
     while True:
         try:
             fcntl.flock(fd, lock_flags)
@@ -186,9 +204,12 @@ def lock_file(
         except OSError:
             logging.info(f"Unable to acquire lock of '{path}'. Waiting {check_interval}")
             assert timeout is not None
-            if time.time() - start < timeout:
-                time.sleep(check_interval)
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                # Don't sleep past the deadline, just to fail once we wake up
+                time.sleep(min(check_interval, remaining))
                 continue
+            os.close(fd)
             raise
 
     logging.debug(f"Lock of '{path}' acquired")
@@ -278,6 +299,61 @@ def copy_with_progress(
     prog_bar.finish()
 
 
+# Errors indicating that a kernel copy method can't be used for a given pair
+# of files (e.g., copy_file_range across filesystems on older kernels)
+_KERNEL_COPY_UNSUPPORTED = frozenset(
+    (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP)
+)
+
+
+def _kernel_copy_methods() -> List[Callable[[int, int, int], int]]:
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        # Python 3.8+. This may also reflink the data on filesystems that support it
+        methods.append(lambda src, dst, count: os.copy_file_range(src, dst, count))
+    if hasattr(os, "sendfile"):
+        methods.append(lambda src, dst, count: os.sendfile(dst, src, None, count))
+    return methods
+
+
+def copy_file_with_progress(
+    source: int, destination: int, size: int, block_size: int = 64 * 1024 * 1024
+) -> None:
+    """Copy 'size' bytes between two file descriptors, showing a progress bar
+
+    The copy is done in the kernel where possible, and falls back to reading
+    and writing through userspace otherwise. Both descriptors are used from
+    their current offsets.
+    """
+    prog_bar = prepare_file_operation_bar(size)
+    bytes_copied = 0
+
+    for copy in _kernel_copy_methods():
+        try:
+            while bytes_copied < size:
+                copied = copy(source, destination, min(block_size, size - bytes_copied))
+                if copied == 0:
+                    break
+                bytes_copied += copied
+                prog_bar.update(bytes_copied)
+            break
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+            logging.debug(f"Kernel copy failed ({e}), trying next method")
+
+    while bytes_copied < size:
+        block = os.read(source, min(64 * 1024, size - bytes_copied))
+        if not block:
+            break
+        while block:
+            written = os.write(destination, block)
+            block = block[written:]
+            bytes_copied += written
+        prog_bar.update(bytes_copied)
+    prog_bar.finish()
+
+
 class StreamDecompressor:
     decompression_method: Optional[Callable[[bytes], bytes]]
 